@@ -13,139 +13,174 @@ clr.AddReference('RevitAPIUI')
 
 # Add path to library
 from pyrevit import revit, forms, script
-from System.Collections.Generic import List
 import Autodesk.Revit.DB as DB
 
+from building_utils import build_curve_loop, get_all_floor_types, get_all_levels, get_all_wall_types
+
 # Get current document
 doc = revit.doc
 
-# Get all levels directly
+# Levels and types come from the shared per-document cache
 try:
-    levels = {}
-    level_collector = DB.FilteredElementCollector(doc).OfClass(DB.Level).ToElements()
-    for level in level_collector:
-        levels[level.Name] = level
-    
-    # Get default level - active view's level or first level
-    default_level = None
-    try:
-        if hasattr(doc.ActiveView, 'GenLevel') and doc.ActiveView.GenLevel is not None:
-            default_level = doc.ActiveView.GenLevel
-        else:
-            default_level = next(iter(levels.values()))
-    except:
-        # If active view doesn't have a level, use the first level
-        if levels:
-            default_level = next(iter(levels.values()))
+    levels = get_all_levels(doc)
 except Exception as e:
-    import traceback
     error_msg = 'Error getting levels: ' + str(e)
     forms.alert(error_msg, exitscript=True)
 
-# Get all wall types with robust error handling
 try:
-    # Try a different approach for getting wall types
-    collector = DB.FilteredElementCollector(doc)
-    collector.OfCategory(DB.BuiltInCategory.OST_Walls)
-    elements = collector.WhereElementIsElementType().ToElements()
-    
-    # Try to get wall types with error handling for each element
-    wall_type_dict = {}
-    
-    # Method 1: Using built-in parameter
-    for element in elements:
-        try:
-            # Try to get name using parameter
-            name_param = element.get_Parameter(DB.BuiltInParameter.ALL_MODEL_TYPE_NAME)
-            if name_param:
-                name = name_param.AsString()
-                wall_type_dict[name] = element
-            else:
-                # Fallback to using the ID as name
-                id_value = element.Id.IntegerValue
-                name = "Wall Type " + str(id_value)
-                wall_type_dict[name] = element
-        except:
-            # Just skip this element and try the next
-            continue
-    
     # Get default wall type
-    default_wall_type = next(iter(wall_type_dict.values()))
+    default_wall_type = next(iter(get_all_wall_types(doc).values()))
 except Exception as e:
-    import traceback
     error_msg = 'Error getting wall types: ' + str(e)
     forms.alert(error_msg, exitscript=True)
 
-# Get all floor types - SIMPLIFIED
+# Get the first floor type, if there is one
 default_floor_type = None
 try:
-    collector = DB.FilteredElementCollector(doc)
-    floor_types = collector.OfCategory(DB.BuiltInCategory.OST_Floors).WhereElementIsElementType().ToElements()
-    
-    if floor_types.Count > 0:
-        # Get the first one
-        enum = floor_types.GetEnumerator()
-        if enum.MoveNext():
-            default_floor_type = enum.Current
+    default_floor_type = next(iter(get_all_floor_types(doc).values()), None)
 except:
     pass
 
+# Get default level - active view's level or first level
+default_level = None
+try:
+    if hasattr(doc.ActiveView, 'GenLevel') and doc.ActiveView.GenLevel is not None:
+        default_level = doc.ActiveView.GenLevel
+    else:
+        default_level = next(iter(levels.values()))
+except:
+    # If active view doesn't have a level, use the first level
+    if levels:
+        default_level = next(iter(levels.values()))
+
+if default_level is None:
+    forms.alert('No levels found in the document.', exitscript=True)
+
+# Read the defaults' Ids and elevation once, not on every command
+default_level_id = default_level.Id
+default_level_elevation = default_level.Elevation
+default_wall_type_id = default_wall_type.Id
+default_floor_type_id = default_floor_type.Id if default_floor_type is not None else None
+
 # Natural language patterns - COMPREHENSIVE PATTERNS
-patterns = {
-    'wall': [
-        r'create\s+(?:a\s+)?wall\s+from\s+\((-?\d+\.?\d*)\s*,\s*(-?\d+\.?\d*)\)\s+to\s+\((-?\d+\.?\d*)\s*,\s*(-?\d+\.?\d*)\)(?:\s+with\s+height\s+(-?\d+\.?\d*))?(?:\s+feet)?',
-        r'add\s+(?:a\s+)?wall\s+(?:from\s+)?\((-?\d+\.?\d*)\s*,\s*(-?\d+\.?\d*)\)(?:\s+to\s+)?\((-?\d+\.?\d*)\s*,\s*(-?\d+\.?\d*)\)(?:\s+with\s+height\s+(-?\d+\.?\d*))?(?:\s+feet)?',
-        r'wall\s+(?:from\s+)?\((-?\d+\.?\d*)\s*,\s*(-?\d+\.?\d*)\)(?:\s+to\s+)?\((-?\d+\.?\d*)\s*,\s*(-?\d+\.?\d*)\)(?:\s+with\s+height\s+(-?\d+\.?\d*))?(?:\s+feet)?',
-    ],
-    'floor': [
+# Ordered (command, subcommand, patterns) entries: cheap help phrases first,
+# then walls from most to least specific, then floors. A list keeps this order
+# on IronPython, where dict iteration order is arbitrary.
+patterns = [
+    ('help', None, [
+        # Anchored so non-help input is rejected at the first character;
+        # the empty string is answered by the fast dispatch table
+        r'\Ahelp',
+        r'\Acommands',
+        r'\Aexamples',
+        r'\Ahow\s+to',
+        r'\Ahelp\s+me',
+        r'\Awhat\s+can\s+you\s+do',
+        r'\Ashow\s+commands',
+        r'\Ashow\s+help',
+        r'\Alist\s+commands',
+        r'\A\?',  # Just a question mark also shows help
+    ]),
+    ('wall', None, [
+        r'create\s+(?:a\s+)?wall\s+from\s+\((-?\d+(?:\.\d*)?)\s*,\s*(-?\d+(?:\.\d*)?)\)\s+to\s+\((-?\d+(?:\.\d*)?)\s*,\s*(-?\d+(?:\.\d*)?)\)(?:\s+with\s+height\s+(-?\d+(?:\.\d*)?))?(?:\s+feet)?',
+        r'add\s+(?:a\s+)?wall\s+(?:from\s+)?\((-?\d+(?:\.\d*)?)\s*,\s*(-?\d+(?:\.\d*)?)\)(?:\s+to\s+)?\((-?\d+(?:\.\d*)?)\s*,\s*(-?\d+(?:\.\d*)?)\)(?:\s+with\s+height\s+(-?\d+(?:\.\d*)?))?(?:\s+feet)?',
+        r'wall\s+(?:from\s+)?\((-?\d+(?:\.\d*)?)\s*,\s*(-?\d+(?:\.\d*)?)\)(?:\s+to\s+)?\((-?\d+(?:\.\d*)?)\s*,\s*(-?\d+(?:\.\d*)?)\)(?:\s+with\s+height\s+(-?\d+(?:\.\d*)?))?(?:\s+feet)?',
+    ]),
+    ('floor', None, [
         # Simple size pattern
         r'(?:create\s+(?:a\s+)?)?floor\s+(\d+)(?:\s*x\s*(\d+))?',
-        # Complex pattern with points
-        r'(?:create\s+(?:a\s+)?)?floor\s+with\s+points\s+(.+)',
         # Alternative syntax
         r'add\s+(?:a\s+)?floor\s+(?:with\s+(?:size|dimensions)\s+)?(\d+)(?:\s*x\s*(\d+))?',
+    ]),
+    ('floor', 'points', [
+        # Complex pattern with points
+        r'(?:create\s+(?:a\s+)?)?floor\s+with\s+points\s+(.+)',
         r'add\s+(?:a\s+)?floor\s+with\s+points\s+(.+)',
-    ],
-    'help': [
-        r'help',
-        r'commands',
-        r'examples',
-        r'how\s+to',
-        r'help\s+me',
-        r'what\s+can\s+you\s+do',
-        r'show\s+commands',
-        r'show\s+help',
-        r'list\s+commands',
-        r'\?',  # Just a question mark also shows help
-        r'^$',  # Empty string shows help too
-    ]
+    ]),
+]
+
+def _build_command_regex(pattern_table):
+    """Fuse every command pattern into one alternation with a named group each.
+
+    Returns the compiled regex and a
+    {group name: (command, subcommand, first, last)} table, where first/last
+    slice match.groups() down to the positional groups of the alternative
+    that matched.
+    """
+    alternatives = []
+    group_table = {}
+    offset = 0
+    for command_type, subcommand, command_patterns in pattern_table:
+        for pattern in command_patterns:
+            name = '{0}{1}'.format(command_type, len(alternatives) + 1)
+            alternatives.append('(?P<{0}>{1})'.format(name, pattern))
+            inner_groups = re.compile(pattern).groups
+            group_table[name] = (command_type, subcommand, offset + 1, offset + 1 + inner_groups)
+            offset += 1 + inner_groups
+    return re.compile('|'.join(alternatives), re.IGNORECASE), group_table
+
+# All commands are matched in a single regex pass, compiled once at import
+COMMAND_RE, _COMMAND_GROUPS = _build_command_regex(patterns)
+
+# Inputs starting like a wall command only need the wall alternatives
+WALL_RE, _WALL_GROUPS = _build_command_regex([entry for entry in patterns if entry[0] == 'wall'])
+_WALL_PREFIXES = ("wall ", "create a wall", "add a wall")
+
+# Initial text of the command box, shown until the user types over it
+HINT_TEXT = "Type 'help' to see available commands"
+
+# The most common inputs are answered without touching the regex engine
+_FAST_COMMANDS = {
+    HINT_TEXT.lower(): 'help',
+    "": 'help',
+    "help": 'help',
+    "commands": 'help',
+    "?": 'help',
+    "examples": 'help',
 }
 
+# Coordinate pairs like (x,y) inside a floor points command
+_POINT_RE = re.compile(r'\(\s*(-?\d+(?:\.\d*)?)\s*,\s*(-?\d+(?:\.\d*)?)\s*\)')
+
+# Parse results by raw input text, so re-submitted commands skip the regex work
+_PARSE_CACHE = {}
+_PARSE_CACHE_SIZE = 128
+
 def parse_command(text):
-    """Parse a natural language command."""
-    # Remove the initial hint text if it's still there
-    hint_text = "Type 'help' to see available commands"
-    if text.strip() == hint_text:
-        text = ""
+    """Parse a natural language command, reusing the result for repeated input.
     
-    text = text.lower().strip()
+    Returns a (command, subcommand, params, text) tuple.
+    """
+    result = _PARSE_CACHE.get(text)
+    if result is None:
+        if len(_PARSE_CACHE) >= _PARSE_CACHE_SIZE:
+            _PARSE_CACHE.clear()
+        result = _PARSE_CACHE[text] = _parse_command(text)
+    return result
+
+def _parse_command(text):
+    """Match a command against the fast paths and the command regex."""
+    # Patterns are case-insensitive, so only surrounding whitespace is dropped
+    text = text.strip()
+    lowered = text.lower()
     
-    # If the command is empty, show help
-    if not text:
-        return {'command': 'help', 'params': None, 'text': text}
+    # The untouched hint, an empty command and "help" all show help
+    fast_command = _FAST_COMMANDS.get(lowered)
+    if fast_command:
+        return (fast_command, None, None, text)
     
-    # Special case for "floor" command with simplified pattern matching
-    if text.startswith("floor "):
-        parts = text.split()
+    command_regex, command_groups = COMMAND_RE, _COMMAND_GROUPS
+    if lowered.startswith(_WALL_PREFIXES):
+        # Wall commands never need the floor or help alternatives
+        command_regex, command_groups = WALL_RE, _WALL_GROUPS
+    elif lowered.startswith("floor "):
+        # Special case for "floor" command with simplified pattern matching
+        parts = lowered.split()
         if len(parts) >= 2:
             # Check for "floor 20" format
             try:
                 size = int(parts[1])
-                return {
-                    'command': 'floor',
-                    'params': (size, size),  # Make it a square by default
-                    'text': text
-                }
+                return ('floor', None, (size, size), text)  # Make it a square by default
             except:
                 pass
             
@@ -156,35 +191,24 @@ def parse_command(text):
                     if len(dims) == 2:
                         width = int(dims[0])
                         height = int(dims[1])
-                        return {
-                            'command': 'floor',
-                            'params': (width, height),
-                            'text': text
-                        }
+                        return ('floor', None, (width, height), text)
                 except:
                     pass
     
     # Try normal pattern matching
-    for command_type, command_patterns in patterns.items():
-        for pattern in command_patterns:
-            match = re.search(pattern, text)
-            if match:
-                if command_type == 'floor' and match.groups()[0] and (len(match.groups()) < 2 or not match.groups()[1]):
-                    # If only one dimension provided, make it a square
-                    size = int(match.groups()[0])
-                    return {
-                        'command': command_type,
-                        'params': (size, size),
-                        'text': text
-                    }
-                else:
-                    return {
-                        'command': command_type,
-                        'params': match.groups(),
-                        'text': text
-                    }
+    match = command_regex.search(text)
+    if match:
+        # The named group that matched tells us which command it was
+        command_type, subcommand, first, last = command_groups[match.lastgroup]
+        groups = match.groups()[first:last]
+        if command_type == 'floor' and subcommand is None and groups[0] and (len(groups) < 2 or not groups[1]):
+            # If only one dimension provided, make it a square
+            size = int(groups[0])
+            return (command_type, subcommand, (size, size), text)
+        else:
+            return (command_type, subcommand, groups, text)
     
-    return {'command': 'unknown', 'params': None, 'text': text}
+    return ('unknown', None, None, text)
 
 def execute_wall_command(params):
     """Execute a wall creation command."""
@@ -204,7 +228,7 @@ def execute_wall_command(params):
     # Create wall
     try:
         # Get level elevation
-        level_elevation = default_level.Elevation
+        level_elevation = default_level_elevation
         
         # Create start and end points with proper elevation
         start_point = DB.XYZ(start_x, start_y, level_elevation)
@@ -218,8 +242,8 @@ def execute_wall_command(params):
             wall = DB.Wall.Create(
                 doc,
                 wall_curve,
-                default_wall_type.Id,
-                default_level.Id,
+                default_wall_type_id,
+                default_level_id,
                 height,
                 0.0,
                 False,
@@ -230,78 +254,67 @@ def execute_wall_command(params):
     except Exception as e:
         return "Error creating wall: {}".format(str(e))
 
-def execute_floor_command(params):
+def execute_floor_command(params, subcommand=None):
     """Execute a floor creation command."""
-    if not params or len(params) < 2:
-        if isinstance(params, tuple) and len(params) > 0 and 'points' in str(params[0]).lower():
+    # Points commands carry the raw coordinate text as their only param
+    is_points = subcommand == 'points'
+    if not params or (not is_points and len(params) < 2):
+        if is_points:
             return "Please provide at least 3 points for the floor in the format (x,y), (x,y), (x,y)."
         else:
             return "I need dimensions to create a floor. Please specify like 'floor 20' or 'floor 20x30'."
     
     # Check if floor type exists
-    if default_floor_type is None:
+    if default_floor_type_id is None:
         return "No floor types available in this document. Please create a floor type first."
     
     try:
         # First, determine if this is a simple dimensions command or a points command
-        if isinstance(params[0], str) and 'points' in params[0].lower():
+        if is_points:
             # This is a points-based floor
             points_text = params[0]
             
-            # Extract coordinates in format (x,y) (x,y) ...
-            coordinates = re.findall(r'\((-?\d+\.?\d*)\s*,\s*(-?\d+\.?\d*)\)', points_text)
+            # Collect the coordinates of the (x,y) (x,y) ... matches
+            xs = []
+            ys = []
+            for m in _POINT_RE.finditer(points_text):
+                xs.append(float(m.group(1)))
+                ys.append(float(m.group(2)))
             
-            if not coordinates or len(coordinates) < 3:
+            if len(xs) < 3:
                 return "I need at least 3 points to create a floor boundary."
-            
-            # Create XYZ points
-            boundary_points = [DB.XYZ(float(x), float(y), 0) for x, y in coordinates]
         else:
             # This is a dimensions-based floor
             width = float(params[0])
             height = float(params[1])
             
             # Create rectangle coordinates
-            boundary_points = [
-                DB.XYZ(0, 0, 0),
-                DB.XYZ(width, 0, 0),
-                DB.XYZ(width, height, 0),
-                DB.XYZ(0, height, 0)
-            ]
-        
-        # Create curve loop
-        curve_loop = DB.CurveLoop()
-        for i in range(len(boundary_points)):
-            start_pt = boundary_points[i]
-            end_pt = boundary_points[(i + 1) % len(boundary_points)]
-            curve = DB.Line.CreateBound(start_pt, end_pt)
-            curve_loop.Append(curve)
+            xs = [0, width, width, 0]
+            ys = [0, 0, height, height]
         
-        # Create list of curve loops
-        curve_loops = List[DB.CurveLoop]()
-        curve_loops.Add(curve_loop)
+        # Create the floor boundary straight from the coordinates
+        curve_loops = build_curve_loop(xs, ys, 0)
         
         # Create floor
         with revit.Transaction('Create Floor'):
             floor = DB.Floor.Create(
                 doc, 
                 curve_loops, 
-                default_floor_type.Id, 
-                default_level.Id
+                default_floor_type_id, 
+                default_level_id
             )
             
             # Format the success message based on input type
-            if isinstance(params[0], str) and 'points' in params[0].lower():
-                points_str = ", ".join(["({},{})".format(x, y) for x, y in coordinates])
+            if is_points:
+                points_str = ", ".join(["({:g},{:g})".format(x, y) for x, y in zip(xs, ys)])
                 return "Floor created successfully with points {}!".format(points_str)
             else:
                 return "Floor created successfully with dimensions {}x{}!".format(params[0], params[1])
     except Exception as e:
         return "Error creating floor: {}".format(str(e))
 
-def show_help():
-    """Show comprehensive help information."""
-    help_text = """Building Assistant Commands:
+# Comprehensive help information, built once at import
+HELP_TEXT = """Building Assistant Commands:
 
 WALL COMMANDS:
 - create a wall from (x,y) to (x,y) [with height h [feet]]
@@ -334,13 +347,12 @@ HELP COMMANDS:
 
 Note: All coordinates are in feet and use the origin (0,0) as reference.
 """
-    return help_text
 
 # Main loop to keep the dialog open
 while True:
     # Use a custom dialog to ensure the hint is shown and the default text clears on click
     command = forms.ask_for_string(
-        default="Type 'help' to see available commands",  # Default text that clears on click
+        default=HINT_TEXT,  # Default text that clears on click
         prompt='Enter your building command:',
         title='Conversational Building Assistant',
         width=600,  # Adjust the width to fit the help text
@@ -351,14 +363,14 @@ while True:
     if command is None:
         break  # Exit the loop if the user closes the dialog
 
-    parsed = parse_command(command)
+    command_type, subcommand, params, _ = parse_command(command)
     
-    if parsed['command'] == 'wall':
-        result = execute_wall_command(parsed['params'])
-    elif parsed['command'] == 'floor':
-        result = execute_floor_command(parsed['params'])
-    elif parsed['command'] == 'help':
-        result = show_help()
+    if command_type == 'wall':
+        result = execute_wall_command(params)
+    elif command_type == 'floor':
+        result = execute_floor_command(params, subcommand)
+    elif command_type == 'help':
+        result = HELP_TEXT
     else:
         result = "I don't understand that command. Type 'help' to see available commands."
     
@@ -6,7 +6,6 @@ import clr
 import sys
 import os
 import traceback
-import math
 ##New comment
 
 # Add references to Revit API
@@ -18,6 +17,8 @@ from pyrevit import revit, forms, script
 from System.Collections.Generic import List
 import Autodesk.Revit.DB as DB
 
+from building_utils import find_material_id, get_all_levels, get_flower_profile_offsets, get_level_names
+
 # Get current document
 doc = revit.doc
 
@@ -35,33 +36,29 @@ def create_flower_pillar_column(doc, x, y, diameter, height, level, num_petals=8
     center_x = x * 3.28084
     center_y = y * 3.28084
     
-    # Create the flower profile
-    profile = DB.CurveLoop()
-    
     # More points for a smoother shape
     num_points = 48  # Multiple of 8 for 8 petals
     
-    # Create points for flower shape
-    points = []
-    for i in range(num_points):
-        angle = 2 * math.pi * i / num_points
-        
-        # Add a subtle petal effect with sine wave, 8 petals
-        # Use a smaller amplitude (0.08) for a subtle effect
-        petal_effect = 1.0 + 0.08 * math.sin(angle * num_petals)
-        
-        # Calculate point with petal effect
-        x_pt = center_x + radius * petal_effect * math.cos(angle)
-        y_pt = center_y + radius * petal_effect * math.sin(angle)
-        
-        points.append(DB.XYZ(x_pt, y_pt, level_elevation))
+    # Bind the per-point callables as locals to skip global and attribute lookups
+    XYZ = DB.XYZ
+    create_line = DB.Line.CreateBound
+    
+    # Create each point of the flower from the cached unit profile and join it
+    # to the previous one as we go, closing the loop back to the first point
+    curves = List[DB.Curve](num_points)
+    add_curve = curves.Add
+    first_pt = prev_pt = None
+    for dx, dy in get_flower_profile_offsets(num_points, num_petals):
+        pt = XYZ(center_x + radius * dx, center_y + radius * dy, level_elevation)
+        if first_pt is None:
+            first_pt = pt
+        else:
+            add_curve(create_line(prev_pt, pt))
+        prev_pt = pt
+    add_curve(create_line(prev_pt, first_pt))
     
-    # Create lines between points
-    for i in range(num_points):
-        start_pt = points[i]
-        end_pt = points[(i + 1) % num_points]
-        line = DB.Line.CreateBound(start_pt, end_pt)
-        profile.Append(line)
+    # Build the flower profile in one call
+    profile = DB.CurveLoop.Create(curves)
     
     # Create profile list
     profile_list = List[DB.CurveLoop]()
@@ -91,13 +88,9 @@ def create_flower_pillar_column(doc, x, y, diameter, height, level, num_petals=8
     
     return direct_shape
 
-# Get all levels
+# Get all levels from the shared per-document cache
 try:
-    levels = {}
-    level_collector = DB.FilteredElementCollector(doc).OfClass(DB.Level).ToElements()
-    for level in level_collector:
-        levels[level.Name] = level
-    level_names = sorted(levels.keys())
+    levels = get_all_levels(doc)
 except Exception as e:
     forms.alert('Error getting levels: ' + str(e), exitscript=True)
 
@@ -106,12 +99,12 @@ try:
     # Select level
     if hasattr(forms, 'CommandSwitchWindow'):
         selected_level = forms.CommandSwitchWindow.show(
-            level_names,
+            get_level_names(doc),
             message='Select level for pillar column:'
         )
     else:
         # Alternative approach if CommandSwitchWindow is not available
-        selected_level = level_names[0]  # Use first level as default
+        selected_level = get_level_names(doc)[0]  # Use first level by name as default
         forms.alert('Using default level: ' + selected_level)
     
     if selected_level:
@@ -164,14 +157,11 @@ try:
                                 
                                 # Try to assign iron material - simplified approach
                                 try:
-                                    materials = DB.FilteredElementCollector(doc).OfClass(DB.Material).ToElements()
-                                    for material in materials:
-                                        material_name = material.Name.lower()
-                                        if "iron" in material_name or "metal" in material_name:
-                                            material_param = column.get_Parameter(DB.BuiltInParameter.MATERIAL_ID_PARAM)
-                                            if material_param and not material_param.IsReadOnly:
-                                                material_param.Set(material.Id)
-                                                break
+                                    iron_material_id = find_material_id(doc, ("iron", "metal"))
+                                    if iron_material_id is not None:
+                                        material_param = column.get_Parameter(DB.BuiltInParameter.MATERIAL_ID_PARAM)
+                                        if material_param and not material_param.IsReadOnly:
+                                            material_param.Set(iron_material_id)
                                 except:
                                     # If material setting fails, just continue
                                     pass
@@ -5,6 +5,8 @@ __doc__ = 'Create floors through a dialog-based interface'
 import clr
 import sys
 import os
+import math
+from array import array
 
 # Add references to Revit API
 clr.AddReference('RevitAPI')
@@ -12,79 +14,38 @@ clr.AddReference('RevitAPIUI')
 
 # Add path to library
 from pyrevit import revit, forms, script
-from System.Collections.Generic import List
 import Autodesk.Revit.DB as DB
 
+from building_utils import build_curve_loop, get_all_floor_types, get_all_levels, get_floor_type_names, get_level_names, parse_points_soa
 
 # Get current document
 doc = revit.doc
 
-# Get all levels directly without utility function first
+# Get all levels from the shared per-document cache
 try:
-    levels = {}
-    level_collector = DB.FilteredElementCollector(doc).OfClass(DB.Level).ToElements()
-    for level in level_collector:
-        levels[level.Name] = level
-    level_names = sorted(levels.keys())
+    levels = get_all_levels(doc)
 except Exception as e:
     forms.alert('Error getting levels: ' + str(e), exitscript=True)
 
-# Get all floor types - ALTERNATIVE APPROACH
+# Stop before collecting floor types when there is nowhere to place a floor
+if not levels:
+    forms.alert("No levels found in the document.", exitscript=True)
+
+# Get all floor types from the shared per-document cache
 try:
-    # Try a different approach - first check if we can get ANY floor types
-    collector = DB.FilteredElementCollector(doc)
-    collector.OfCategory(DB.BuiltInCategory.OST_Floors)
-    elements = collector.WhereElementIsElementType().ToElements()
-    
-    # See if we have any elements
-    if elements.Count == 0:
-        forms.alert("No floor types found in the document.", exitscript=True)
-    
-    # Try to get floor types
-    floor_type_dict = {}
-    
-    # Method 1: Using built-in parameter
-    for element in elements:
-        try:
-            # Try to get name using parameter
-            name_param = element.get_Parameter(DB.BuiltInParameter.ALL_MODEL_TYPE_NAME)
-            if name_param:
-                name = name_param.AsString()
-                floor_type_dict[name] = element
-        except:
-            pass
-    
-    # Method 2: Check if we have any types, if not, try direct approach
-    if not floor_type_dict:
-        for element in elements:
-            try:
-                # Try a direct property access
-                id_value = element.Id.IntegerValue
-                # Use ID as name if we can't get the actual name
-                name = "Floor Type " + str(id_value)
-                floor_type_dict[name] = element
-            except:
-                pass
-    
-    # If we still don't have any types, try one more approach
-    if not floor_type_dict:
-        # Get default floor type
-        default_floor_type_id = DB.ElementId(DB.BuiltInCategory.OST_Floors)
-        if default_floor_type_id:
-            floor_type_dict["Default Floor"] = doc.GetElement(default_floor_type_id)
+    floor_type_dict = get_all_floor_types(doc)
     
-    # Check if we found any floor types
+    # See if we have any floor types
     if not floor_type_dict:
-        forms.alert("Could not retrieve floor types. Please check your Revit document.", exitscript=True)
-    
-    # Get the names and sort them
-    floor_type_names = sorted(floor_type_dict.keys())
-    
+        forms.alert("No floor types found in the document.", exitscript=True)
 except Exception as e:
     forms.alert('Error getting floor types: ' + str(e), exitscript=True)
 
 # Get user inputs through forms
 try:
+    # Names are sorted once per document change
+    level_names = get_level_names(doc)
+    
     # Check if forms.CommandSwitchWindow exists
     if hasattr(forms, 'CommandSwitchWindow'):
         selected_level = forms.CommandSwitchWindow.show(
@@ -100,6 +61,7 @@ try:
         )
     
     if selected_level:
+        floor_type_names = get_floor_type_names(doc)
         if hasattr(forms, 'CommandSwitchWindow'):
             selected_floor_type = forms.CommandSwitchWindow.show(
                 floor_type_names,
@@ -121,62 +83,37 @@ try:
             
             if coords:
                 try:
-                    # Parse points without utility function
-                    boundary_points = []
-                    
-                    # Clean up the input
-                    coords = coords.strip()
-                    
-                    # Parse coordinates
-                    for point_str in coords.split():
-                        coords_parts = [float(x) for x in point_str.split(',')]
-                        if len(coords_parts) >= 2:
-                            boundary_points.append(DB.XYZ(coords_parts[0], coords_parts[1], 0))
+                    # Parse points into coordinate arrays; floors are flat, so any z is ignored
+                    xs, ys, _ = parse_points_soa(coords.strip())
                     
                     # Ensure we have at least 3 points to create a valid floor
-                    if len(boundary_points) < 3:
+                    if len(xs) < 3:
                         forms.alert("Need at least 3 points to create a floor boundary.")
                         raise ValueError("Not enough points")
                         
                     # Check for minimum distance between points
                     min_distance = 0.3  # Revit's tolerance in feet
-                    valid_points = [boundary_points[0]]
+                    valid_xs = array('d', xs[:1])
+                    valid_ys = array('d', ys[:1])
                     
-                    for i in range(1, len(boundary_points)):
-                        current = boundary_points[i]
-                        last = valid_points[-1]
-                        
-                        # Calculate distance between points
-                        distance = current.DistanceTo(last)
-                        
-                        # Only add point if distance is greater than minimum
-                        if distance >= min_distance:
-                            valid_points.append(current)
+                    for x, y in zip(xs[1:], ys[1:]):
+                        # Only add point if distance to the last kept point is greater than minimum
+                        if math.hypot(x - valid_xs[-1], y - valid_ys[-1]) >= min_distance:
+                            valid_xs.append(x)
+                            valid_ys.append(y)
                     
                     # If we don't have enough valid points, use a default rectangle
-                    if len(valid_points) < 3:
-                        valid_points = [
-                            DB.XYZ(0, 0, 0),
-                            DB.XYZ(20, 0, 0),
-                            DB.XYZ(20, 20, 0),
-                            DB.XYZ(0, 20, 0)
-                        ]
+                    if len(valid_xs) < 3:
+                        valid_xs = array('d', [0, 20, 20, 0])
+                        valid_ys = array('d', [0, 0, 20, 20])
                     
-                    # Create curve loop for floor boundary
-                    curve_loop = DB.CurveLoop()
-                    for i in range(len(valid_points)):
-                        start_pt = valid_points[i]
-                        end_pt = valid_points[(i + 1) % len(valid_points)]
-                        
-                        # Only create curve if distance between points is sufficient
-                        distance = start_pt.DistanceTo(end_pt)
-                        if distance >= min_distance:
-                            curve = DB.Line.CreateBound(start_pt, end_pt)
-                            curve_loop.Append(curve)
+                    # Drop a last point that would close the loop with a too-short line
+                    if len(valid_xs) > 3 and math.hypot(valid_xs[-1] - valid_xs[0], valid_ys[-1] - valid_ys[0]) < min_distance:
+                        valid_xs.pop()
+                        valid_ys.pop()
                     
-                    # Create list of curve loops
-                    curve_loops = List[DB.CurveLoop]()
-                    curve_loops.Add(curve_loop)
+                    # Create the floor boundary straight from the kept coordinates
+                    curve_loops = build_curve_loop(valid_xs, valid_ys, 0)
                     
                     # Create floor
                     with revit.Transaction('Create Floor'):
@@ -5,7 +5,6 @@ __title__ = 'Hollow\nVault'
 __doc__ = 'Create hollow barrel vault section with interior arch'
 
 import clr
-import sys
 import os
 import math
 import traceback
@@ -19,23 +18,34 @@ from pyrevit import revit, forms, script
 from System.Collections.Generic import List
 import Autodesk.Revit.DB as DB
 
+from building_utils import get_all_levels, get_arch_profile_offsets, get_level_names
+
 # Get current document
 doc = revit.doc
 
-# Get all levels
+# Vault dimensions are entered in meters; Revit works in feet
+FEET_PER_METER = 3.28084
+
+# Arch segment counts grow with the vault so each chord stays near this length (feet)
+ARCH_CHORD_LENGTH = 0.5
+MIN_ARCH_SEGMENTS = 6
+MAX_ARCH_SEGMENTS = 48
+
+# Vaults are created as Generic Model direct shapes
+VAULT_CATEGORY_ID = DB.ElementId(DB.BuiltInCategory.OST_GenericModel)
+
+# Get all levels from the shared per-document cache
 try:
-    levels = {}
-    level_collector = DB.FilteredElementCollector(doc).OfClass(DB.Level).ToElements()
-    for level in level_collector:
-        levels[level.Name] = level
-    level_names = sorted(levels.keys())
+    levels = get_all_levels(doc)
+    level_names = get_level_names(doc)
 except Exception as e:
     forms.alert('Error getting levels: ' + str(e), exitscript=True)
 
-def create_hollow_barrel_vault(doc, base_width, arch_height, vault_depth, wall_thickness, level):
+def create_hollow_barrel_vault(doc, base_width, arch_height, vault_depth, wall_thickness, level, num_segments=None):
     """Create a hollow barrel vault section with interior arch.
     
-    Uses a different approach with two separate solids that are joined.
+    Built from two solid end walls and an arched shell extruded with the
+    inner profile as its hole, so no Boolean operation is needed.
     
     Args:
         doc: Revit document
@@ -44,6 +54,7 @@ def create_hollow_barrel_vault(doc, base_width, arch_height, vault_depth, wall_t
         vault_depth: Depth of the vault section in meters
         wall_thickness: Thickness of the vault walls in meters
         level: Revit level element
+        num_segments: Number of arch segments, or None to size them to the arch
         
     Returns:
         DirectShape element representing the hollow barrel vault section
@@ -56,61 +67,52 @@ def create_hollow_barrel_vault(doc, base_width, arch_height, vault_depth, wall_t
         raise ValueError("Wall thickness is too large relative to vault dimensions")
         
     # Convert values to feet (Revit's internal unit)
-    feet_base_width = base_width * 3.28084
-    feet_arch_height = arch_height * 3.28084
-    feet_vault_depth = vault_depth * 3.28084
-    feet_wall_thickness = wall_thickness * 3.28084
+    feet_base_width = base_width * FEET_PER_METER
+    feet_arch_height = arch_height * FEET_PER_METER
+    feet_vault_depth = vault_depth * FEET_PER_METER
+    feet_wall_thickness = wall_thickness * FEET_PER_METER
     
     # Get level elevation
     level_elevation = level.Elevation
     
+    # Bind the per-point constructor as a local for the arch loops
+    XYZ = DB.XYZ
+    
     try:
-        # APPROACH: Create the full vault, then create and subtract an inner void
-        
         # 1. First create the outer vault profile
-        outer_profile = DB.CurveLoop()
+        # Number of segments for smooth curves, from the half-ellipse estimate
+        # of the arch length so small vaults get short profiles
+        if num_segments is None:
+            arch_length = math.pi * 0.5 * (feet_base_width * 0.5 + feet_arch_height)
+            num_segments = max(MIN_ARCH_SEGMENTS, min(MAX_ARCH_SEGMENTS, int(arch_length / ARCH_CHORD_LENGTH)))
         
-        # Number of segments for smooth curves
-        num_segments = 10
+        # Unit arch scaled to the vault: semi-circular arch formula z = h * sin(θ)
+        arch_offsets = get_arch_profile_offsets(num_segments)
         
         # Base points
-        p_left = DB.XYZ(0, 0, level_elevation)
-        p_right = DB.XYZ(feet_base_width, 0, level_elevation)
+        p_left = XYZ(0, 0, level_elevation)
+        p_right = XYZ(feet_base_width, 0, level_elevation)
         
         # Points for outer arch
         outer_points = [p_left]
         
         # Create outer arch curve
-        for i in range(1, num_segments):
+        for t, sin_theta in arch_offsets:
             # Position along width
-            t = float(i) / float(num_segments)
             x = feet_base_width * t
+            z = feet_arch_height * sin_theta
             
-            # Semi-circular arch formula: z = h * sin(θ)
-            theta = t * math.pi
-            z = feet_arch_height * math.sin(theta)
-            
-            arch_point = DB.XYZ(x, 0, level_elevation + z)
+            arch_point = XYZ(x, 0, level_elevation + z)
             outer_points.append(arch_point)
         
         outer_points.append(p_right)
         
-        # Create outer profile curves
-        min_curve_length = 0.05  # Minimum length in feet
-        
-        for i in range(len(outer_points) - 1):
-            start_pt = outer_points[i]
-            end_pt = outer_points[i + 1]
-            
-            if start_pt.DistanceTo(end_pt) >= min_curve_length:
-                curve = DB.Line.CreateBound(start_pt, end_pt)
-                outer_profile.Append(curve)
-            else:
-                print("Skipping short segment: {} feet".format(start_pt.DistanceTo(end_pt)))
-        
-        # Close the outer profile
-        base_line = DB.Line.CreateBound(p_right, p_left)
-        outer_profile.Append(base_line)
+        # Create the outer arch as a single spline through the arch points,
+        # closed by the base line, then the outer profile in one call
+        curves = List[DB.Curve](2)
+        curves.Add(DB.HermiteSpline.Create(List[DB.XYZ](outer_points), False))
+        curves.Add(DB.Line.CreateBound(p_right, p_left))
+        outer_profile = DB.CurveLoop.Create(curves)
         
         # Verify outer profile is valid
         if outer_profile.IsOpen():
@@ -119,63 +121,36 @@ def create_hollow_barrel_vault(doc, base_width, arch_height, vault_depth, wall_t
         if not outer_profile.HasPlane():
             raise ValueError("Outer profile is not planar")
         
-        # Create outer profile list
-        outer_profile_list = List[DB.CurveLoop]()
-        outer_profile_list.Add(outer_profile)
-        
-        # Create the solid outer vault by extrusion
-        outer_vault = DB.GeometryCreationUtilities.CreateExtrusionGeometry(
-            outer_profile_list,
-            DB.XYZ.BasisY,  # Extrude in Y direction
-            feet_vault_depth
-        )
-        
-        # 2. Now create the inner void profile (offset inward)
-        inner_width = feet_base_width - (2 * feet_wall_thickness)
-        inner_height = feet_arch_height - feet_wall_thickness
+        # 2. Now create the inner profile
         inner_depth = feet_vault_depth - (2 * feet_wall_thickness)
         
-        # Calculate inner curve start points
-        p_left_inner = DB.XYZ(feet_wall_thickness, feet_wall_thickness, level_elevation + feet_wall_thickness)
-        p_right_inner = DB.XYZ(feet_base_width - feet_wall_thickness, feet_wall_thickness, level_elevation + feet_wall_thickness)
-        
-        # Create inner profile
-        inner_profile = DB.CurveLoop()
-        
-        # Points for inner arch
-        inner_points = [p_left_inner]
-        
-        # Create inner arch curve
-        for i in range(1, num_segments):
-            # Position along width
-            t = float(i) / float(num_segments)
-            
-            # Scale to inner width
-            x = feet_wall_thickness + (inner_width * t)
+        # An even offset folds over itself once the wall is thicker than the
+        # radius of curvature at the crown of z = h * sin(pi * x / w)
+        crown_radius = feet_base_width ** 2 / (math.pi ** 2 * feet_arch_height)
+        if feet_wall_thickness < crown_radius:
+            # Offset the outer profile inward by the wall thickness, which keeps
+            # the shell evenly thick. The offset side follows the loop
+            # direction, so keep whichever side gives the shorter (inner) loop
+            inner_profile = DB.CurveLoop.CreateViaOffset(outer_profile, feet_wall_thickness, DB.XYZ.BasisY)
+            if inner_profile.GetExactLength() > outer_profile.GetExactLength():
+                inner_profile = DB.CurveLoop.CreateViaOffset(outer_profile, -feet_wall_thickness, DB.XYZ.BasisY)
+        else:
+            # Otherwise scale the outer arch down to the inner width and height
+            inner_width = feet_base_width - (2 * feet_wall_thickness)
+            inner_height = feet_arch_height - feet_wall_thickness
+            inner_base_z = level_elevation + feet_wall_thickness
             
-            # Semi-circular arch formula for inner surface
-            theta = t * math.pi
-            z = level_elevation + feet_wall_thickness + (inner_height * math.sin(theta))
-            
-            inner_arch_point = DB.XYZ(x, feet_wall_thickness, z)
-            inner_points.append(inner_arch_point)
-        
-        inner_points.append(p_right_inner)
-        
-        # Create inner profile curves
-        for i in range(len(inner_points) - 1):
-            start_pt = inner_points[i]
-            end_pt = inner_points[i + 1]
+            p_left_inner = XYZ(feet_wall_thickness, 0, inner_base_z)
+            p_right_inner = XYZ(feet_base_width - feet_wall_thickness, 0, inner_base_z)
+            inner_points = [p_left_inner]
+            for t, sin_theta in arch_offsets:
+                inner_points.append(XYZ(feet_wall_thickness + inner_width * t, 0, inner_base_z + inner_height * sin_theta))
+            inner_points.append(p_right_inner)
             
-            if start_pt.DistanceTo(end_pt) >= min_curve_length:
-                curve = DB.Line.CreateBound(start_pt, end_pt)
-                inner_profile.Append(curve)
-            else:
-                print("Skipping short inner segment: {} feet".format(start_pt.DistanceTo(end_pt)))
-        
-        # Close the inner profile
-        inner_base_line = DB.Line.CreateBound(p_right_inner, p_left_inner)
-        inner_profile.Append(inner_base_line)
+            curves = List[DB.Curve](2)
+            curves.Add(DB.HermiteSpline.Create(List[DB.XYZ](inner_points), False))
+            curves.Add(DB.Line.CreateBound(p_right_inner, p_left_inner))
+            inner_profile = DB.CurveLoop.Create(curves)
         
         # Verify inner profile is valid
         if inner_profile.IsOpen():
@@ -184,38 +159,34 @@ def create_hollow_barrel_vault(doc, base_width, arch_height, vault_depth, wall_t
         if not inner_profile.HasPlane():
             raise ValueError("Inner profile is not planar")
         
-        # Create inner profile list
-        inner_profile_list = List[DB.CurveLoop]()
-        inner_profile_list.Add(inner_profile)
-        
-        # Create the inner void by extrusion (shorter depth)
-        inner_void = DB.GeometryCreationUtilities.CreateExtrusionGeometry(
-            inner_profile_list,
-            DB.XYZ.BasisY,  # Extrude in Y direction
-            inner_depth
-        )
-        
-        # 3. Create a hollow vault by Boolean difference
-        # First create a transform to position the inner void
-        translation_vector = DB.XYZ(0, 0, 0)  # Already positioned correctly
-        transform = DB.Transform.CreateTranslation(translation_vector)
-        
-        # Apply the transform to the inner void
-        transformed_inner_void = DB.SolidUtils.CreateTransformed(inner_void, transform)
-        
-        # Create the hollow vault by subtracting the inner void from the outer vault
-        hollow_vault = DB.BooleanOperationsUtils.ExecuteBooleanOperation(
-            outer_vault,
-            transformed_inner_void,
-            DB.BooleanOperationsType.Difference
-        )
+        # 3. Build the hollow vault from solids that only touch, so no Boolean
+        # difference is needed: a solid end wall, the arched shell with the
+        # inner profile as its hole, and the other end wall
+        extrude = DB.GeometryCreationUtilities.CreateExtrusionGeometry
+        
+        # One profile list is reused for all three extrusions
+        profile_list = List[DB.CurveLoop]()
+        profile_list.Add(outer_profile)
+        start_wall = extrude(profile_list, DB.XYZ.BasisY, feet_wall_thickness)
+        
+        # Move both profiles to where the shell starts
+        shell_start = DB.Transform.CreateTranslation(XYZ(0, feet_wall_thickness, 0))
+        profile_list.Clear()
+        profile_list.Add(DB.CurveLoop.CreateViaTransform(outer_profile, shell_start))
+        profile_list.Add(DB.CurveLoop.CreateViaTransform(inner_profile, shell_start))
+        shell = extrude(profile_list, DB.XYZ.BasisY, inner_depth)
+        
+        # Move the outer profile to where the far end wall starts
+        end_start = DB.Transform.CreateTranslation(XYZ(0, feet_vault_depth - feet_wall_thickness, 0))
+        profile_list.Clear()
+        profile_list.Add(DB.CurveLoop.CreateViaTransform(outer_profile, end_start))
+        end_wall = extrude(profile_list, DB.XYZ.BasisY, feet_wall_thickness)
         
         # Create direct shape element for the hollow vault
-        category_id = DB.ElementId(DB.BuiltInCategory.OST_GenericModel)
-        direct_shape = DB.DirectShape.CreateElement(doc, category_id)
+        direct_shape = DB.DirectShape.CreateElement(doc, VAULT_CATEGORY_ID)
         
         # Add geometry to direct shape
-        direct_shape.SetShape([hollow_vault])
+        direct_shape.SetShape([start_wall, shell, end_wall])
         
         # Set a meaningful name
         try:
@@ -230,8 +201,44 @@ def create_hollow_barrel_vault(doc, base_width, arch_height, vault_depth, wall_t
         print("Error creating hollow vault: " + str(e))
         raise e
 
-# Main script
-try:
+# Vault dimensions in the order they are entered in the dimensions dialog
+_DIMENSION_NAMES = ('Width', 'Height', 'Depth', 'Thickness')
+
+def _parse_positive(value, name):
+    """Convert a dimension string to a positive float, naming it on failure."""
+    try:
+        dimension = float(value)
+    except ValueError:
+        raise ValueError('{} must be a number.'.format(name))
+    if dimension <= 0:
+        raise ValueError('{} must be a positive number.'.format(name))
+    return dimension
+
+def _validate(values):
+    """Convert the entered vault dimensions to floats and check them together.
+    
+    Args:
+        values: Width, height, depth and thickness strings in meters
+        
+    Returns:
+        (width, height, depth, thickness) tuple of floats
+        
+    Raises:
+        ValueError: naming the first field that is missing or invalid
+    """
+    if len(values) != len(_DIMENSION_NAMES):
+        raise ValueError('Enter 4 values: width, height, depth and thickness.')
+    
+    width, height, depth, thickness = [
+        _parse_positive(value, name) for name, value in zip(_DIMENSION_NAMES, values)
+    ]
+    if thickness >= width/2 or thickness >= height:
+        raise ValueError('Thickness is too large for vault dimensions.')
+    
+    return width, height, depth, thickness
+
+def main():
+    """Ask for a level and the vault dimensions, then create the vault."""
     # Select level
     if hasattr(forms, 'CommandSwitchWindow'):
         selected_level = forms.CommandSwitchWindow.show(
@@ -243,92 +250,42 @@ try:
         selected_level = level_names[0]  # Use first level as default
         forms.alert('Using default level: ' + selected_level)
     
-    if selected_level:
-        # Get vault base width
-        vault_width = forms.ask_for_string(
-            default='1.0',
-            prompt='Enter vault span width (meters):',
-            title='Vault Span Width'
-        )
-        
-        if vault_width:
-            try:
-                # Validate width
-                width = float(vault_width)
-                if width <= 0:
-                    forms.alert('Width must be a positive number.', title='Invalid Input')
-                    sys.exit()
-                
-                # Get vault height
-                vault_height = forms.ask_for_string(
-                    default=str(width/2),  # Default height is half the width for a semicircular arch
-                    prompt='Enter vault rise height (meters):',
-                    title='Vault Rise Height'
-                )
-                
-                if vault_height:
-                    try:
-                        # Validate height
-                        height = float(vault_height)
-                        if height <= 0:
-                            forms.alert('Height must be a positive number.', title='Invalid Input')
-                            sys.exit()
-                        
-                        # Get vault depth
-                        vault_depth = forms.ask_for_string(
-                            default=str(width),  # Default depth equals width
-                            prompt='Enter vault section depth (meters):',
-                            title='Vault Section Depth'
-                        )
-                        
-                        if vault_depth:
-                            try:
-                                # Validate depth
-                                depth = float(vault_depth)
-                                if depth <= 0:
-                                    forms.alert('Depth must be a positive number.', title='Invalid Input')
-                                    sys.exit()
-                                
-                                # Get wall thickness
-                                wall_thickness = forms.ask_for_string(
-                                    default=str(0.1),  # Default 10cm thickness
-                                    prompt='Enter vault wall thickness (meters):',
-                                    title='Wall Thickness'
-                                )
-                                
-                                if wall_thickness:
-                                    try:
-                                        # Validate thickness
-                                        thickness = float(wall_thickness)
-                                        if thickness <= 0:
-                                            forms.alert('Thickness must be a positive number.', title='Invalid Input')
-                                            sys.exit()
-                                        
-                                        if thickness >= width/2 or thickness >= height:
-                                            forms.alert('Thickness is too large for vault dimensions.', title='Invalid Input')
-                                            sys.exit()
-                                        
-                                        # Create the hollow barrel vault section
-                                        with revit.Transaction('Create Hollow Barrel Vault'):
-                                            try:
-                                                vault_section = create_hollow_barrel_vault(
-                                                    doc, width, height, depth, thickness, levels[selected_level]
-                                                )
-                                                forms.alert(
-                                                    'Hollow Barrel Vault created successfully!',
-                                                    title='Success'
-                                                )
-                                            except Exception as inner_e:
-                                                forms.alert('Error creating vault: ' + str(inner_e), title='Error')
-                                    except ValueError as ve:
-                                        forms.alert('Invalid thickness: ' + str(ve), title='Error')
-                            except ValueError as ve:
-                                forms.alert('Invalid depth: ' + str(ve), title='Error')
-                    except ValueError as ve:
-                        forms.alert('Invalid height: ' + str(ve), title='Error')
-            except ValueError as ve:
-                forms.alert('Invalid width: ' + str(ve), title='Error')
+    if not selected_level:
+        return
     
-except Exception as e:
-    error_details = str(e) + "\n\n" + traceback.format_exc()
-    forms.alert('Error in script: ' + error_details)
\ No newline at end of file
+    # Get all vault dimensions from one dialog; the default is a
+    # semicircular arch with height half the width and depth equal to it
+    vault_dimensions = forms.ask_for_string(
+        default='1.0 0.5 1.0 0.1',
+        prompt='Enter vault span width, rise height, section depth and wall thickness (meters):',
+        title='Vault Dimensions'
+    )
+    
+    if not vault_dimensions:
+        return
+    
+    # Validate all dimensions at once
+    try:
+        width, height, depth, thickness = _validate(vault_dimensions.replace(',', ' ').split())
+    except ValueError as ve:
+        forms.alert(str(ve), title='Invalid Input')
+        return
+    
+    # Create the hollow barrel vault section
+    with revit.Transaction('Create Hollow Barrel Vault'):
+        try:
+            create_hollow_barrel_vault(doc, width, height, depth, thickness, levels[selected_level])
+            forms.alert(
+                'Hollow Barrel Vault created successfully!',
+                title='Success'
+            )
+        except Exception as inner_e:
+            forms.alert('Error creating vault: ' + str(inner_e), title='Error')
+
+# Main script
+if __name__ == '__main__':
+    try:
+        main()
+    except Exception as e:
+        error_details = str(e) + "\n\n" + traceback.format_exc()
+        forms.alert('Error in script: ' + error_details)
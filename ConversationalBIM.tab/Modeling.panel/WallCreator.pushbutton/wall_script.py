@@ -5,6 +5,7 @@ __doc__ = 'Create walls through a dialog-based interface'
 import clr
 import sys
 import os
+import traceback
 
 # Add references to Revit API
 clr.AddReference('RevitAPI')
@@ -14,165 +15,184 @@ clr.AddReference('RevitAPIUI')
 from pyrevit import revit, forms, script
 import Autodesk.Revit.DB as DB
 
+from building_utils import WarningSwallower, get_all_levels, get_all_wall_types, get_level_names, get_wall_type_names
+
 # Get current document
 doc = revit.doc
 
-# Get all levels directly without utility function
+# Set to True to include tracebacks in error alerts
+DEBUG = False
+
+# Get all levels from the shared per-document cache
 try:
-    levels = {}
-    level_collector = DB.FilteredElementCollector(doc).OfClass(DB.Level).ToElements()
-    for level in level_collector:
-        levels[level.Name] = level
-    level_names = sorted(levels.keys())
+    levels = get_all_levels(doc)
+    level_names = get_level_names(doc)
 except Exception as e:
     forms.alert('Error getting levels: ' + str(e), exitscript=True)
 
-# Get all wall types - Directly without utility function with better error handling
+# Stop before collecting wall types when there is nowhere to place a wall
+if not levels:
+    forms.alert("No levels found in the document.", exitscript=True)
+
+# Get all wall types from the shared per-document cache
 try:
-    # Try a different approach for getting wall types
-    collector = DB.FilteredElementCollector(doc)
-    collector.OfCategory(DB.BuiltInCategory.OST_Walls)
-    elements = collector.WhereElementIsElementType().ToElements()
-    
-    # See if we have any elements
-    if elements.Count == 0:
-        forms.alert("No wall types found in the document.", exitscript=True)
-    
-    # Try to get wall types with error handling for each element
-    wall_type_dict = {}
-    
-    # Method 1: Using built-in parameter
-    for element in elements:
-        try:
-            # Try to get name using parameter
-            name_param = element.get_Parameter(DB.BuiltInParameter.ALL_MODEL_TYPE_NAME)
-            if name_param:
-                name = name_param.AsString()
-                wall_type_dict[name] = element
-            else:
-                # Fallback to using the ID as name
-                id_value = element.Id.IntegerValue
-                name = "Wall Type " + str(id_value)
-                wall_type_dict[name] = element
-        except Exception as inner_e:
-            # Just skip this element and try the next
-            continue
+    wall_type_dict = get_all_wall_types(doc)
     
-    # If we still don't have any types, try one more approach
+    # See if we have any wall types
     if not wall_type_dict:
-        # Try different category or method
-        default_wall_cat = DB.ElementId(DB.BuiltInCategory.OST_Walls)
-        if default_wall_cat:
-            wall_type_dict["Default Wall"] = doc.GetElement(default_wall_cat)
-    
-    # Check if we found any wall types
-    if not wall_type_dict:
-        forms.alert("Could not retrieve wall types. Please check your Revit document.", exitscript=True)
+        forms.alert("No wall types found in the document.", exitscript=True)
     
-    # Get the names and sort them
-    wall_type_names = sorted(wall_type_dict.keys())
+    # Names are sorted once per document change
+    wall_type_names = get_wall_type_names(doc)
 except Exception as e:
-    import traceback
-    error_msg = 'Error getting wall types: ' + str(e) + "\n" + traceback.format_exc() 
+    error_msg = 'Error getting wall types: ' + str(e)
+    if DEBUG:
+        error_msg += "\n" + traceback.format_exc()
     forms.alert(error_msg, exitscript=True)
 
-# Get user inputs through forms
-try:
-    # Check if forms.CommandSwitchWindow exists
-    if hasattr(forms, 'CommandSwitchWindow'):
-        selected_level = forms.CommandSwitchWindow.show(
-            level_names,
-            message='Select level for wall:'
-        )
-    else:
-        # Alternative form if CommandSwitchWindow doesn't exist
-        selected_level = forms.select_from_list(
-            level_names,
-            title='Select level for wall',
-            message='Select level'
-        )
+# One dialog gathers the level, wall type, height and coordinates together
+WALL_FORM_XAML = """
+<Window xmlns="http://schemas.microsoft.com/winfx/2006/xaml/presentation"
+        xmlns:x="http://schemas.microsoft.com/winfx/2006/xaml"
+        Title="Create Walls" Width="420" SizeToContent="Height"
+        WindowStartupLocation="CenterScreen" ResizeMode="NoResize">
+    <StackPanel Margin="10">
+        <TextBlock Text="Level:"/>
+        <ComboBox x:Name="level_cb" Margin="0,2,0,8"/>
+        <TextBlock Text="Wall type:"/>
+        <ComboBox x:Name="wall_type_cb" Margin="0,2,0,8"/>
+        <TextBlock Text="Wall height (feet):"/>
+        <TextBox x:Name="height_tb" Text="10.0" Margin="0,2,0,8"/>
+        <TextBlock Text="Wall start and end points (x,y x,y), separating walls with ';':"/>
+        <TextBox x:Name="coords_tb" Text="0,0 10,0" Margin="0,2,0,8"/>
+        <StackPanel Orientation="Horizontal" HorizontalAlignment="Right">
+            <Button Content="Create" Width="80" IsDefault="True" Click="create_click"/>
+            <Button Content="Cancel" Width="80" Margin="8,0,0,0" IsCancel="True"/>
+        </StackPanel>
+    </StackPanel>
+</Window>
+"""
+
+class WallForm(forms.WPFWindow):
+    """Dialog that asks for every wall input at once."""
     
-    if selected_level:
-        if hasattr(forms, 'CommandSwitchWindow'):
-            selected_wall_type = forms.CommandSwitchWindow.show(
-                wall_type_names,
-                message='Select wall type:'
-            )
-        else:
-            selected_wall_type = forms.select_from_list(
-                wall_type_names,
-                title='Select wall type',
-                message='Select wall type'
-            )
+    def __init__(self, level_names, wall_type_names):
+        forms.WPFWindow.__init__(self, WALL_FORM_XAML, literal_string=True)
+        self.level_cb.ItemsSource = level_names
+        self.level_cb.SelectedIndex = 0
+        self.wall_type_cb.ItemsSource = wall_type_names
+        self.wall_type_cb.SelectedIndex = 0
+        # Stays None if the dialog is cancelled
+        self.values = None
+    
+    def create_click(self, sender, args):
+        """Keep the entered values and close the dialog."""
+        self.values = {
+            'level': self.level_cb.SelectedItem,
+            'wall_type': self.wall_type_cb.SelectedItem,
+            'height': self.height_tb.Text,
+            'coords': self.coords_tb.Text,
+        }
+        self.Close()
+
+def parse_wall_points(coords):
+    """Parse "x,y x,y; x,y x,y ..." into (start_x, start_y, end_x, end_y) tuples."""
+    wall_points = []
+    for wall_coords in coords.split(';'):
+        points = wall_coords.split()
+        if len(points) != 2:
+            raise ValueError("Please provide exactly two points for each wall.")
+        
+        # Parse start coordinates
+        start_parts = points[0].split(',')
+        if len(start_parts) < 2:
+            raise ValueError("Invalid start coordinates format. Use x,y")
+        start_x = float(start_parts[0])
+        start_y = float(start_parts[1])
+        
+        # Parse end coordinates
+        end_parts = points[1].split(',')
+        if len(end_parts) < 2:
+            raise ValueError("Invalid end coordinates format. Use x,y")
+        end_x = float(end_parts[0])
+        end_y = float(end_parts[1])
+        
+        # Keep plain floats; XYZs are only built once the elevation is known
+        wall_points.append((start_x, start_y, end_x, end_y))
+    return wall_points
+
+def create_walls(wall_points, level, wall_type, height):
+    """Create one wall per (start_x, start_y, end_x, end_y) tuple in a single transaction."""
+    # Look up the level and type once for all walls
+    level_elevation = level.Elevation
+    level_id = level.Id
+    wall_type_id = wall_type.Id
+    
+    # Create all walls in one transaction, so the model regenerates once and
+    # warnings such as wall joins are dismissed together when it commits
+    walls = []
+    transaction = DB.Transaction(doc, 'Create Walls')
+    transaction.Start()
+    try:
+        options = transaction.GetFailureHandlingOptions()
+        options.SetFailuresPreprocessor(WarningSwallower())
+        options.SetClearAfterRollback(True)
+        transaction.SetFailureHandlingOptions(options)
         
-        if selected_wall_type:
-            wall_height = forms.ask_for_string(
-                default='10.0',
-                prompt='Enter wall height (feet):',
-                title='Wall Height'
+        for start_x, start_y, end_x, end_y in wall_points:
+            # Create curve for wall path
+            wall_curve = DB.Line.CreateBound(
+                DB.XYZ(start_x, start_y, level_elevation),
+                DB.XYZ(end_x, end_y, level_elevation)
             )
             
-            if wall_height:
-                try:
-                    height = float(wall_height)
-                    
-                    coords = forms.ask_for_string(
-                        default='0,0 10,0',
-                        prompt='Enter wall start and end points (x,y x,y):',
-                        title='Wall Coordinates'
-                    )
-                    
-                    if coords:
-                        # Parse points without utility function
-                        try:
-                            points = coords.split()
-                            if len(points) != 2:
-                                forms.alert('Please provide exactly two points.')
-                            else:
-                                # Parse start coordinates
-                                start_parts = points[0].split(',')
-                                if len(start_parts) < 2:
-                                    raise ValueError("Invalid start coordinates format. Use x,y")
-                                start_x = float(start_parts[0])
-                                start_y = float(start_parts[1])
-                                start_coords = DB.XYZ(start_x, start_y, 0)
-                                
-                                # Parse end coordinates
-                                end_parts = points[1].split(',')
-                                if len(end_parts) < 2:
-                                    raise ValueError("Invalid end coordinates format. Use x,y")
-                                end_x = float(end_parts[0])
-                                end_y = float(end_parts[1])
-                                end_coords = DB.XYZ(end_x, end_y, 0)
-                                
-                                # Create the wall directly without utility function
-                                with revit.Transaction('Create Wall'):
-                                    # Get level elevation
-                                    level_elevation = levels[selected_level].Elevation
-                                    
-                                    # Create curve for wall path
-                                    wall_curve = DB.Line.CreateBound(
-                                        DB.XYZ(start_coords.X, start_coords.Y, level_elevation),
-                                        DB.XYZ(end_coords.X, end_coords.Y, level_elevation)
-                                    )
-                                    
-                                    # Create wall
-                                    wall = DB.Wall.Create(
-                                        doc,
-                                        wall_curve,
-                                        wall_type_dict[selected_wall_type].Id,
-                                        levels[selected_level].Id,
-                                        height,
-                                        0.0,  # offset from level
-                                        False,  # flip orientation
-                                        True  # structural
-                                    )
-                                    
-                                    if wall:
-                                        forms.alert('Wall created successfully!', title='Success')
-                        except Exception as e:
-                            forms.alert('Error creating wall: ' + str(e))
-                except ValueError:
-                    forms.alert('Please enter a valid number for height.')
+            # Create wall
+            wall = DB.Wall.Create(
+                doc,
+                wall_curve,
+                wall_type_id,
+                level_id,
+                height,
+                0.0,  # offset from level
+                False,  # flip orientation
+                True  # structural
+            )
+            if wall:
+                walls.append(wall)
+        status = transaction.Commit()
+    except Exception:
+        # Commit may already have ended the transaction before raising
+        if transaction.GetStatus() == DB.TransactionStatus.Started:
+            transaction.RollBack()
+        raise
+    if status != DB.TransactionStatus.Committed:
+        raise ValueError("Walls could not be created; the transaction was rolled back.")
+    return walls
+
+# Get user inputs through one form
+try:
+    wall_form = WallForm(level_names, wall_type_names)
+    wall_form.show_dialog()
+    values = wall_form.values
+    
+    if values:
+        try:
+            height = float(values['height'])
+        except ValueError:
+            forms.alert('Please enter a valid number for height.')
+        else:
+            try:
+                walls = create_walls(
+                    parse_wall_points(values['coords']),
+                    levels[values['level']],
+                    wall_type_dict[values['wall_type']],
+                    height
+                )
+                if len(walls) == 1:
+                    forms.alert('Wall created successfully!', title='Success')
+                elif walls:
+                    forms.alert('{} walls created successfully!'.format(len(walls)), title='Success')
+            except Exception as e:
+                forms.alert('Error creating wall: ' + str(e))
 except Exception as e:
-    forms.alert('Error in form processing: ' + str(e))
\ No newline at end of file
+    forms.alert('Error in form processing: ' + str(e))
@@ -1,23 +1,258 @@
 """Utility functions for conversational building modeling."""
 import clr
+import math
+import re
+from array import array
 
 # Add references to Revit API
 clr.AddReference('RevitAPI')
 clr.AddReference('RevitAPIUI')
 
 # Import Revit API
-from Autodesk.Revit.DB import XYZ, Level, FloorType, WallType, Line, Wall, Floor, FilteredElementCollector, CurveLoop
+from Autodesk.Revit.DB import XYZ, Element, Level, FloorType, WallType, Material, Curve, Line, Wall, Floor, FilteredElementCollector, CurveLoop
+from Autodesk.Revit.DB import IFailuresPreprocessor, FailureProcessingResult, ElementClassFilter
+from System import AppDomain
 from System.Collections.Generic import List
 
-def get_all_levels(doc):
-    """Get all levels in the document."""
-    collector = FilteredElementCollector(doc).OfClass(Level).ToElements()
+# Per-document results kept between script runs, dropped when the document closes.
+# Revit hands out a new Document wrapper on each access, but Document overrides
+# Equals/GetHashCode, so every wrapper of one open document finds the same entry.
+_DOCUMENT_CACHE = {}
+
+def get_document_cache(doc):
+    """Get a dict for caching results on this document between script runs."""
+    _watch_document_changes(doc)
+    return _DOCUMENT_CACHE.setdefault(doc, {})
+
+# Element classes whose ({name: element}, sorted names, element id ints) entries are cached, with their cache keys
+_CACHED_ELEMENT_CLASSES = ((Level, 'levels'), (WallType, 'wall_types'), (FloorType, 'floor_types'))
+
+# There is one Application per Revit process, so the cache subscribes to its
+# events once. The handlers are also kept in an AppDomain slot, which outlives
+# pyRevit reloads, so a reloaded module can detach the previous module's handlers.
+_SUBSCRIBED = False
+_HANDLERS_SLOT = 'ConversationalBIM.building_utils.document_handlers'
+
+def _on_document_changed(sender, args):
+    """Drop the cached element entries that a document change added to, modified or deleted from.
+    
+    Deleted elements are already invalid here, so they are matched through
+    the id ints stored with each entry rather than through the elements.
+    """
+    try:
+        doc_cache = _DOCUMENT_CACHE.get(args.GetDocument())
+        if not doc_cache:
+            return
+        
+        deleted_ids = None
+        for element_class, key in _CACHED_ELEMENT_CLASSES:
+            entry = doc_cache.get(key)
+            if entry is None:
+                continue
+            class_filter = ElementClassFilter(element_class)
+            if args.GetAddedElementIds(class_filter).Count or args.GetModifiedElementIds(class_filter).Count:
+                del doc_cache[key]
+                continue
+            if deleted_ids is None:
+                deleted_ids = set(element_id.IntegerValue for element_id in args.GetDeletedElementIds())
+            if not deleted_ids.isdisjoint(entry[2]):
+                del doc_cache[key]
+    except Exception:
+        # Nothing may escape a Revit event handler; forget everything cached instead
+        _DOCUMENT_CACHE.clear()
+
+def _on_document_closing(sender, args):
+    """Drop everything cached for a document that is about to close."""
+    try:
+        _DOCUMENT_CACHE.pop(args.Document, None)
+    except Exception:
+        # Nothing may escape a Revit event handler; forget everything cached instead
+        _DOCUMENT_CACHE.clear()
+
+def _watch_document_changes(doc):
+    """Subscribe the cache to DocumentChanged and DocumentClosing once per Revit session."""
+    global _SUBSCRIBED
+    if _SUBSCRIBED:
+        return
+    app = doc.Application
+    domain = AppDomain.CurrentDomain
+    previous_handlers = domain.GetData(_HANDLERS_SLOT)
+    if previous_handlers is not None:
+        on_changed, on_closing = previous_handlers
+        app.DocumentChanged -= on_changed
+        app.DocumentClosing -= on_closing
+    app.DocumentChanged += _on_document_changed
+    app.DocumentClosing += _on_document_closing
+    domain.SetData(_HANDLERS_SLOT, (_on_document_changed, _on_document_closing))
+    _SUBSCRIBED = True
+
+def _get_cached_elements(doc, key, collect):
+    """Get a cached ({name: element}, sorted names, element id ints) entry.
+    
+    The entry is collected again after a change touches it. The names are
+    sorted once per collection and kept as a tuple so every caller can share it.
+    """
+    doc_cache = get_document_cache(doc)
+    entry = doc_cache.get(key)
+    if entry is None:
+        elements = collect(doc)
+        element_ids = frozenset(element.Id.IntegerValue for element in elements.values())
+        entry = (elements, tuple(sorted(elements)), element_ids)
+        doc_cache[key] = entry
+    return entry
+
+def _get_type_name(element_type, fallback_prefix):
+    """Get an element type's name, falling back to its Id when it has none."""
+    # ElementType hides the Name getter from IronPython, so read it via Element
+    name = Element.Name.GetValue(element_type)
+    if not name:
+        name = "{} {}".format(fallback_prefix, element_type.Id.IntegerValue)
+    return name
+
+def _iter_unit_circle(angle_step, count):
+    """Yield (cos, sin) of angle_step * k for k in range(count).
+    
+    Each step rotates the previous pair, so only the first call costs any trig.
+    """
+    cos_step = math.cos(angle_step)
+    sin_step = math.sin(angle_step)
+    c, s = 1.0, 0.0
+    for k in range(count):
+        yield c, s
+        c, s = c * cos_step - s * sin_step, s * cos_step + c * sin_step
+        if k % 64 == 63:
+            # Pull the pair back onto the unit circle to stop rounding drift
+            r = 1.5 - 0.5 * (c * c + s * s)
+            c, s = c * r, s * r
+
+# Unit-radius flower column profiles, keyed by (num_points, num_petals, amplitude)
+_FLOWER_PROFILE_CACHE = {}
+
+def get_flower_profile_offsets(num_points, num_petals, petal_amplitude=0.08):
+    """Get (dx, dy) offsets of a unit-radius flower profile with sine-wave petals."""
+    key = (num_points, num_petals, petal_amplitude)
+    offsets = _FLOWER_PROFILE_CACHE.get(key)
+    if offsets is None:
+        angle_step = 2 * math.pi / num_points
+        petal_angles = _iter_unit_circle(angle_step * num_petals, num_points)
+        offsets = []
+        for (c, s), (_, petal_s) in zip(_iter_unit_circle(angle_step, num_points), petal_angles):
+            r = 1.0 + petal_amplitude * petal_s
+            offsets.append((r * c, r * s))
+        offsets = tuple(offsets)
+        _FLOWER_PROFILE_CACHE[key] = offsets
+    return offsets
+
+# Unit barrel vault arch profiles, keyed by num_segments
+_ARCH_PROFILE_CACHE = {}
+
+def get_arch_profile_offsets(num_segments):
+    """Get (t, z) offsets of the interior points of a unit sine arch.
+    
+    t runs across the span and z = sin(pi * t) is the rise, both from 0 to 1;
+    the two base points are left to the caller.
+    """
+    offsets = _ARCH_PROFILE_CACHE.get(num_segments)
+    if offsets is None:
+        t_step = 1.0 / num_segments
+        unit_circle = _iter_unit_circle(math.pi * t_step, num_segments)
+        next(unit_circle)  # Skip the left base point
+        offsets = tuple(
+            (i * t_step, s)
+            for i, (_, s) in enumerate(unit_circle, 1)
+        )
+        _ARCH_PROFILE_CACHE[num_segments] = offsets
+    return offsets
+
+def _collect_levels(doc):
+    """Collect all levels in the document by name."""
+    collector = FilteredElementCollector(doc).OfClass(Level)
     return {level.Name: level for level in collector}
 
+def _collect_wall_types(doc):
+    """Collect all wall types in the document by name."""
+    collector = FilteredElementCollector(doc).OfClass(WallType)
+    return {_get_type_name(wt, "Wall Type"): wt for wt in collector}
+
+def _collect_floor_types(doc):
+    """Collect all floor types in the document by name.
+    
+    Foundation slab types share the FloorType class but sit in the
+    Structural Foundations category, so they are left out.
+    """
+    collector = FilteredElementCollector(doc).OfClass(FloorType)
+    return {_get_type_name(ft, "Floor Type"): ft for ft in collector if not ft.IsFoundationSlab}
+
+def get_all_levels(doc):
+    """Get all levels in the document, cached per document."""
+    return _get_cached_elements(doc, 'levels', _collect_levels)[0]
+
+def get_level_names(doc):
+    """Get the sorted names of all levels in the document, cached per document."""
+    return _get_cached_elements(doc, 'levels', _collect_levels)[1]
+
 def get_all_wall_types(doc):
-    """Get all wall types in the document."""
-    collector = FilteredElementCollector(doc).OfClass(WallType).ToElements()
-    return {wt.Name: wt for wt in collector}
+    """Get all wall types in the document, cached per document."""
+    return _get_cached_elements(doc, 'wall_types', _collect_wall_types)[0]
+
+def get_wall_type_names(doc):
+    """Get the sorted names of all wall types in the document, cached per document."""
+    return _get_cached_elements(doc, 'wall_types', _collect_wall_types)[1]
+
+def get_all_floor_types(doc):
+    """Get all floor types in the document, cached per document."""
+    return _get_cached_elements(doc, 'floor_types', _collect_floor_types)[0]
+
+def get_floor_type_names(doc):
+    """Get the sorted names of all floor types in the document, cached per document."""
+    return _get_cached_elements(doc, 'floor_types', _collect_floor_types)[1]
+
+def find_material_id(doc, keywords):
+    """Get the Id of the first material whose name contains one of the keywords.
+    
+    The result is cached per document until that material is deleted.
+    """
+    doc_cache = get_document_cache(doc)
+    key = ('material_id',) + tuple(keywords)
+    material_id = doc_cache.get(key)
+    if material_id is not None and doc.GetElement(material_id) is not None:
+        return material_id
+    
+    material_id = None
+    for material in FilteredElementCollector(doc).OfClass(Material):
+        material_name = material.Name.lower()
+        if any(keyword in material_name for keyword in keywords):
+            material_id = material.Id
+            break
+    doc_cache[key] = material_id
+    return material_id
+
+def build_curve_loop(xs, ys, z):
+    """Build a closed profile through the (xs[i], ys[i]) points at height z.
+    
+    Each point's XYZ is created once and shared by the two lines that meet
+    there. Returns a List[CurveLoop] holding the single loop, ready for
+    create_floor.
+    """
+    num_points = len(xs)
+    curves = List[Curve](num_points)
+    first_pt = prev_pt = XYZ(xs[0], ys[0], z)
+    for i in range(1, num_points):
+        pt = XYZ(xs[i], ys[i], z)
+        curves.Add(Line.CreateBound(prev_pt, pt))
+        prev_pt = pt
+    curves.Add(Line.CreateBound(prev_pt, first_pt))
+    
+    profile = List[CurveLoop]()
+    profile.Add(CurveLoop.Create(curves))
+    return profile
+
+class WarningSwallower(IFailuresPreprocessor):
+    """Failures preprocessor that dismisses every warning when a transaction commits."""
+    
+    def PreprocessFailures(self, failures_accessor):
+        failures_accessor.DeleteAllWarnings()
+        return FailureProcessingResult.Continue
 
 def create_wall(doc, start_point, end_point, wall_type_id, level_id, height=10.0):
     """Create a wall between two points."""
@@ -42,17 +277,61 @@ def create_floor(doc, profile, floor_type_id, level_id):
     floor = Floor.Create(doc, profile, floor_type_id, level_id)
     return floor
 
+# One coordinate number, in every form float() accepts for a coordinate, that
+# fills a whole comma- or whitespace-separated field
+_FLOAT_RE = re.compile(r'(?<![^\s,])[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?(?![^\s,])')
+
 def parse_point_input(point_str):
-    """Parse a string like "0,0" into an XYZ point."""
-    coords = [float(x) for x in point_str.split(',')]
-    if len(coords) == 2:
-        return XYZ(coords[0], coords[1], 0)
-    elif len(coords) == 3:
-        return XYZ(coords[0], coords[1], coords[2])
-    else:
+    """Parse a string like "0,0" into an XYZ point.
+    
+    The commas are located with str.find, so the common 'x,y' case is
+    sliced straight into floats without building a list.
+    """
+    first_comma = point_str.find(',')
+    if first_comma < 0:
+        raise ValueError("Point string should be in format 'x,y' or 'x,y,z'")
+    second_comma = point_str.find(',', first_comma + 1)
+    if second_comma >= 0 and point_str.find(',', second_comma + 1) >= 0:
+        raise ValueError("Point string should be in format 'x,y' or 'x,y,z'")
+    try:
+        x = float(point_str[:first_comma])
+        if second_comma < 0:
+            return XYZ(x, float(point_str[first_comma + 1:]), 0)
+        return XYZ(x, float(point_str[first_comma + 1:second_comma]), float(point_str[second_comma + 1:]))
+    except ValueError:
+        raise ValueError("Point string should be in format 'x,y' or 'x,y,z'")
+
+def parse_points_soa(points_str):
+    """Parse a string of multiple points like "0,0 1,1 2,2" into coordinate arrays.
+    
+    All coordinates are pulled out in one regex pass; the first point decides
+    whether every point is 'x,y' or 'x,y,z'. Returns (xs, ys, zs) array('d')
+    buffers with one entry per point, where 2D points get z = 0.
+    """
+    points = points_str.split()
+    if not points:
+        return array('d'), array('d'), array('d')
+    
+    stride = points[0].count(',') + 1
+    if stride not in (2, 3):
         raise ValueError("Point string should be in format 'x,y' or 'x,y,z'")
+    
+    # Each field holds at most one match, so with stride fields per point the
+    # count only adds up when every field is a number
+    coords = [float(x) for x in _FLOAT_RE.findall(points_str)]
+    if len(coords) != stride * len(points) or any(point.count(',') != stride - 1 for point in points):
+        raise ValueError("All points should be numbers in the same 'x,y' or 'x,y,z' format as the first one")
+    
+    xs = array('d', coords[0::stride])
+    ys = array('d', coords[1::stride])
+    zs = array('d', coords[2::3]) if stride == 3 else array('d', [0.0]) * len(xs)
+    return xs, ys, zs
+
+def soa_to_xyz(xs, ys, zs, i):
+    """Build the XYZ point at index i of (xs, ys, zs) coordinate arrays."""
+    return XYZ(xs[i], ys[i], zs[i])
 
 def parse_points_input(points_str):
     """Parse a string of multiple points like "0,0 1,1 2,2" into a list of XYZ points."""
-    points = points_str.split()
-    return [parse_point_input(p) for p in points]
\ No newline at end of file
+    xs, ys, zs = parse_points_soa(points_str)
+    return [soa_to_xyz(xs, ys, zs, i) for i in range(len(xs))]